@@ -1,23 +1,78 @@
 import dataclasses
 import msgpack
 import numpy as np
+import os
+import struct
+import threading
 from abc import ABC, abstractmethod
-from io import BytesIO
+from ast import literal_eval
+from concurrent.futures import Executor, ThreadPoolExecutor
 from datetime import datetime
-from lz4.frame import compress as lz4_compress, decompress as lz4_decompress
-from typing import Any
+from functools import partial
+from lz4.block import compress as lz4_block_compress
+from lz4.block import decompress as lz4_decompress
+from numpy.lib.format import dtype_to_descr, descr_to_dtype
+from operator import attrgetter
+from typing import Any, Iterable, List
 
 # Maximum byte lengths for str/ext
 MAX_STR_LEN = 2147483647
 MAX_EXT_LEN = 2147483647
 
+# Only compress msgpack data of at least this size, below this
+# LZ4 costs more than it saves
+COMPRESS_MIN_SIZE = 256
+
+# Last byte of dumped data, flags if the msgpack data is compressed
+UNCOMPRESSED = b'\x00'
+COMPRESSED = b'\x01'
+
+# Return a bytearray, so the compression flag can be appended in place
+lz4_compress = partial(lz4_block_compress, return_bytearray=True)
+
+# Packers with a larger buffer than this are not reused
+PACKER_MAX_BUFFER_SIZE = 1024 * 1024
+
+# Numpy array header: ndim, flags, length of the dtype description
+NUMPY_HEADER = struct.Struct('<BBH')
+NUMPY_FORTRAN_ORDER = 1
+NUMPY_SHUFFLED = 2
+# The array data starts at a multiple of this
+NUMPY_ALIGNMENT = 16
+
+# Datetime timestamp as little-endian double
+DATETIME_TIMESTAMP = struct.Struct('<d')
+
+# Slice: None mask, start, stop, step
+SLICE = struct.Struct('<Bqqq')
+
 
 # Internal registry
 # TODO: figure out if it is ok to do
 # this on the module...
 REGISTRY = {'obj_types': {},
             'ext_types': {},
-            'serializables': {}}
+            'serializables': {},
+            'field_getters': {},
+            'constructors': {}}
+
+# Direct references for the lookups in default/ext_hook/DataclassHandler
+_OBJ_TYPES = REGISTRY['obj_types']
+_FIELD_GETTERS = REGISTRY['field_getters']
+_ExtType = msgpack.ExtType
+
+# ext_type -> handler.unpackb, indexed directly by the ext_type.
+# Application ext_types are 0..127, the reserved negative ext_types
+# index into the (always empty) upper half of the table.
+_EXT_TABLE = [None] * 256
+
+# Per thread msgpack Packer, see _get_packer/_release_packer, and
+# if the dumpb call of the thread compresses (compress)
+_local = threading.local()
+
+# Shared executor for dumpb_many/loadb_many, see _get_executor
+_executor = None
+_executor_lock = threading.Lock()
 
 
 def register(obj_def):
@@ -31,23 +86,78 @@ def register(obj_def):
         # via register.
         class_name = obj_def.__name__
         REGISTRY['serializables'][class_name] = obj_def
+        field_getter, constructor = _dataclass_field_functions(obj_def)
+        REGISTRY['field_getters'][obj_def] = field_getter
+        REGISTRY['constructors'][class_name] = constructor
         REGISTRY['obj_types'][obj_def] = DataclassHandler
 
         # Register the DataclassHandler if not done already
         if DataclassHandler.ext_type not in REGISTRY['ext_types']:
-            REGISTRY['ext_types'][
-                DataclassHandler.ext_type] = DataclassHandler
+            _register_ext_type(DataclassHandler)
     else:
         # Assume the obj_def has obj_type and ext_type, as can be
         # seen below.
         assert hasattr(obj_def, 'obj_type') and hasattr(obj_def, 'ext_type')
-        REGISTRY['obj_types'][obj_def.obj_type] = obj_def
-        REGISTRY['ext_types'][obj_def.ext_type] = obj_def
+        obj_types = obj_def.obj_type
+        if not isinstance(obj_types, tuple):
+            obj_types = (obj_types,)
+        for obj_type in obj_types:
+            REGISTRY['obj_types'][obj_type] = obj_def
+        _register_ext_type(obj_def)
+
+
+def _dataclass_field_functions(klass):
+    """
+    Return a function that returns the field values of a klass
+    instance as tuple (positional init fields first, then keyword only
+    init fields, then the init=False fields) and a function that
+    creates a klass instance from those values.
+    """
+    args = []
+    kwargs = []
+    no_init = []
+    for field in dataclasses.fields(klass):
+        if not field.init:
+            no_init.append(field.name)
+        elif getattr(field, 'kw_only', False):
+            kwargs.append(field.name)
+        else:
+            args.append(field.name)
+    names = tuple(args + kwargs + no_init)
+
+    if len(names) > 1:
+        field_getter = attrgetter(*names)
+    else:
+        def field_getter(obj):
+            return tuple(getattr(obj, name) for name in names)
+
+    if not kwargs and not no_init:
+        return field_getter, klass
+
+    n_args = len(args)
+    n_init = n_args + len(kwargs)
+
+    def constructor(*values):
+        obj = klass(
+            *values[:n_args], **dict(zip(kwargs, values[n_args:n_init])))
+        # Restore the init=False fields, these may have been changed
+        # after construction. object.__setattr__ also works for
+        # frozen dataclasses.
+        for name, value in zip(no_init, values[n_init:]):
+            object.__setattr__(obj, name, value)
+        return obj
+    return field_getter, constructor
+
+
+def _register_ext_type(handler):
+    assert 0 <= handler.ext_type < 128, 'ext_type should be in 0..127'
+    REGISTRY['ext_types'][handler.ext_type] = handler
+    _EXT_TABLE[handler.ext_type] = handler.unpackb
 
 
 class AbstractHandler(ABC):
     ext_type: int = None  # Unique number
-    obj_type: Any = None  # Unique object type
+    obj_type: Any = None  # Unique object type (or tuple of types)
 
     @classmethod
     @abstractmethod
@@ -66,53 +176,123 @@ class AbstractHandler(ABC):
 
 class NumpyArrayHandler(AbstractHandler):
     """
-    Use np.save and np.load to serialize/deserialize
-    numpy array's.
+    Serialize numpy array's as a small binary header followed
+    by the raw array data:
+
+        ndim (uint8), flags (uint8), len(descr) (uint16),
+        shape (ndim x int64), descr (utf-8), padding, data
+
+    The padding makes the data start at a multiple of NUMPY_ALIGNMENT
+    bytes, so the deserialized array's are aligned.
+
+    Deserialization uses np.frombuffer on the ext data, so no copy
+    of the array data is made. The resulting array is read-only.
+
+    Numeric array's are byte shuffled when they are packed by a dumpb
+    call that compresses (if shuffle is True), those array's are
+    copied on deserialization but are read-only as well.
     """
     ext_type = 1
-    obj_type = np.ndarray
+    # np.void = the type of items of structured array's
+    obj_type = (np.ndarray, np.void)
+    shuffle = True
 
-    # Note:
-    # More generic approach, but a bit slower than
-    # packing it as a list/tuple with (dtype, shape, bytes)
     @classmethod
     def packb(cls, array: np.ndarray) -> bytes:
-        buf = BytesIO()
-        np.save(buf, array)
-        buf.seek(0)
-        return buf.read()
+        if type(array) is np.void:
+            # Serialize as 0-d array
+            array = np.asarray(array)
+        if array.dtype.hasobject:
+            raise TypeError(
+                "Cannot serialize numpy array's with dtype object")
+
+        # Pass the array's buffer directly to b''.join below, this
+        # avoids an intermediate copy via array.tobytes()
+        flags = 0
+        if array.flags.c_contiguous:
+            data = array
+        elif array.flags.f_contiguous:
+            # The transpose of a Fortran ordered array is C contiguous
+            flags |= NUMPY_FORTRAN_ORDER
+            data = array.T
+        else:
+            data = np.ascontiguousarray(array)
+
+        itemsize = array.dtype.itemsize
+        if (cls.shuffle and getattr(_local, 'compress', False) and
+                array.dtype.kind in 'iufc' and
+                itemsize in (2, 4, 8) and
+                array.nbytes >= COMPRESS_MIN_SIZE):
+            # Group the n-th bytes of all items together, this helps
+            # LZ4 a lot on numeric data (Blosc style byte shuffle)
+            flags |= NUMPY_SHUFFLED
+            data = np.ascontiguousarray(
+                data.reshape(-1).view(np.uint8).reshape(-1, itemsize).T)
+
+        if array.dtype.fields is None:
+            descr = array.dtype.str
+        else:
+            # Structured dtype, use the same description as np.save
+            descr = repr(dtype_to_descr(array.dtype))
+        descr = descr.encode('utf-8')
+
+        ndim = array.ndim
+        header_size = NUMPY_HEADER.size + 8 * ndim + len(descr)
+        return b''.join((
+            NUMPY_HEADER.pack(ndim, flags, len(descr)),
+            struct.pack('<%dq' % ndim, *array.shape),
+            descr,
+            bytes(-header_size % NUMPY_ALIGNMENT),
+            data))
 
     @classmethod
     def unpackb(cls, data: bytes) -> np.ndarray:
-        buf = BytesIO(data)
-        buf.seek(0)
-        return np.load(buf)
-
-
-class NumpyStructuredArrayHandler(NumpyArrayHandler):
-    ext_type = 2
-    obj_type = np.void  # = the type of structured array's...
+        ndim, flags, descr_len = NUMPY_HEADER.unpack_from(data)
+        offset = NUMPY_HEADER.size
+        shape = struct.unpack_from('<%dq' % ndim, data, offset)
+        offset += 8 * ndim
+        descr = data[offset:offset + descr_len].decode('utf-8')
+        offset += descr_len
+        offset += -offset % NUMPY_ALIGNMENT
+
+        if descr.startswith('['):
+            dtype = descr_to_dtype(literal_eval(descr))
+        else:
+            dtype = np.dtype(descr)
+
+        order = 'F' if flags & NUMPY_FORTRAN_ORDER else 'C'
+        if flags & NUMPY_SHUFFLED:
+            shuffled = np.frombuffer(
+                data, dtype=np.uint8, offset=offset).reshape(
+                    dtype.itemsize, -1)
+            array = np.ascontiguousarray(shuffled.T).view(dtype).reshape(
+                shape, order=order)
+            # Read-only, same as the unshuffled np.frombuffer array's
+            array.flags.writeable = False
+            return array
+        return np.frombuffer(
+            data, dtype=dtype, offset=offset).reshape(shape, order=order)
 
 
 class DatetimeHandler:
     """
-    Serialize datetime instances as timestamps.
+    Serialize datetime instances as timestamps (8 byte double).
     """
     ext_type = 3
     obj_type = datetime
 
     @classmethod
     def packb(cls, dt: datetime) -> bytes:
-        return b'%f' % dt.timestamp()
+        return DATETIME_TIMESTAMP.pack(dt.timestamp())
 
     @classmethod
     def unpackb(cls, data: bytes) -> datetime:
-        return datetime.fromtimestamp(float(data))
+        return datetime.fromtimestamp(DATETIME_TIMESTAMP.unpack(data)[0])
 
 
 class DataclassHandler:
     """
-    Serialize dataclasses by serializing the .__dict__
+    Serialize dataclasses by serializing the values of the fields
     of dataclasses. This allows recursively serialization for example:
     dataclasses in dataclasses or Numpy array's in dataclasses.
     """
@@ -120,42 +300,68 @@ class DataclassHandler:
 
     @classmethod
     def packb(cls, obj) -> bytes:
-        dataclass_name = obj.__class__.__name__
-        if isinstance(dataclass_name, str):
-            dataclass_name = dataclass_name
-
         # Recursively process dataclasses of the dataclass,
-        # serialize as tuple(dataclass_name, __dict__)
-        return dumpb(
-            (dataclass_name, obj.__dict__),
-            do_compress=False)
+        # serialize as tuple(dataclass_name, field values). The outer
+        # dumpb takes care of compression.
+        klass = obj.__class__
+        return msgpack.packb(
+            (klass.__name__, _FIELD_GETTERS[klass](obj)),
+            default=default, use_bin_type=True)
 
     @classmethod
     def unpackb(cls, data):
         # Recursively process the contents of the dataclass
-        classname, data = loadb(
-            data, do_decompress=False, raw=False)
+        classname, values = msgpack.unpackb(
+            data, ext_hook=ext_hook, max_ext_len=MAX_EXT_LEN,
+            max_str_len=MAX_STR_LEN, raw=False,
+            strict_map_key=False)
         # Return registered class or Serializable (as default)
         assert classname in REGISTRY['serializables'], \
             f'class {classname} not yet registered'
-        klass = REGISTRY['serializables'][classname]
-        return klass(**data)
+        return REGISTRY['constructors'][classname](*values)
 
 
 class SliceHandler:
     """
     Serialize slices
+
+    Slices of integers (or None) are packed as a struct with a mask
+    byte that flags the None values, other slices fall back to a
+    msgpack (start, stop, step) tuple.
     """
     ext_type = 5
     obj_type = slice
 
     @classmethod
     def packb(cls, obj) -> bytes:
-        return dumpb((obj.start, obj.stop, obj.step))
+        start, stop, step = obj.start, obj.stop, obj.step
+        if ((start is None or type(start) is int) and
+                (stop is None or type(stop) is int) and
+                (step is None or type(step) is int)):
+            mask = ((start is None) | (stop is None) << 1 |
+                    (step is None) << 2)
+            try:
+                return SLICE.pack(mask, start or 0, stop or 0, step or 0)
+            except struct.error:
+                # Out of the int64 range
+                pass
+        return msgpack.packb(
+            (start, stop, step), default=default, use_bin_type=True)
 
     @classmethod
     def unpackb(cls, data):
-        return slice(*loadb(data))
+        if data[0] > 7:
+            # Not a mask byte, msgpack array
+            return slice(*msgpack.unpackb(
+                data, ext_hook=ext_hook, max_ext_len=MAX_EXT_LEN,
+                max_str_len=MAX_STR_LEN, raw=False, use_list=False,
+                strict_map_key=False))
+
+        mask, start, stop, step = SLICE.unpack(data)
+        return slice(
+            None if mask & 1 else start,
+            None if mask & 2 else stop,
+            None if mask & 4 else step)
 
 
 class NumpyInt32Handler(AbstractHandler):
@@ -194,7 +400,6 @@ class NumpyInt64Handler(AbstractHandler):
 
 # Register custom handlers
 register(NumpyArrayHandler)
-register(NumpyStructuredArrayHandler)
 register(DatetimeHandler)
 register(SliceHandler)
 register(NumpyInt32Handler)
@@ -206,12 +411,11 @@ def default(obj: Any):
     Serialize (dumpb) hook for obj types that msgpack does not
     process out of the box.
     """
-    if type(obj) in REGISTRY['obj_types']:
+    handler = _OBJ_TYPES.get(type(obj))
+    if handler is not None:
         # If the type is in the registry, use the
         # handler to serialize the obj
-        handler = REGISTRY['obj_types'][type(obj)]
-        return msgpack.ExtType(
-            handler.ext_type, handler.packb(obj))
+        return _ExtType(handler.ext_type, handler.packb(obj))
 
     raise TypeError("Unknown type: %r" % (obj,))
 
@@ -224,28 +428,138 @@ def ext_hook(ext_type: int, bytes_data: bytes):
     ext_types are user defined numbers for special
     deserialization handling.
     """
-    if ext_type in REGISTRY['ext_types']:
+    unpackb = _EXT_TABLE[ext_type]
+    if unpackb is not None:
         # If the ext_type is in the registry, use the
         # handler to deserialize the bytes_data
-        handler = REGISTRY['ext_types'][ext_type]
-        return handler.unpackb(bytes_data)
+        return unpackb(bytes_data)
 
     raise TypeError("Unknown ext_type: %r" % (ext_type,))  # pragma: no cover
 
 
-def do_nothing(x):
-    return x
+def _get_packer() -> msgpack.Packer:
+    """
+    Take the msgpack Packer of the current thread, the Packer (and its
+    internal buffer) is reused between dumpb calls.
+
+    The Packer is removed from the thread while in use, so a nested
+    dumpb call (for example from a handler's packb) gets a new Packer
+    instead of writing into the half-built buffer of the outer call.
+    Hand it back with _release_packer.
+    """
+    packer = getattr(_local, 'packer', None)
+    if packer is None:
+        return msgpack.Packer(
+            default=default, use_bin_type=True, autoreset=False)
+    _local.packer = None
+    return packer
+
+
+def _release_packer(packer: msgpack.Packer, size: int):
+    packer.reset()
+    # Don't keep large buffers around
+    if size <= PACKER_MAX_BUFFER_SIZE:
+        _local.packer = packer
+
+
+def _pack(instance: Any, use_bin_type: bool, do_compress: bool) -> bytes:
+    """
+    Pack instance with msgpack (no compression)
+    """
+    # Let the handlers know if the data will be compressed
+    compress = getattr(_local, 'compress', False)
+    _local.compress = do_compress
+    try:
+        if not use_bin_type:
+            return msgpack.packb(
+                instance, default=default, use_bin_type=False)
+
+        packer = _get_packer()
+        packed = b''
+        try:
+            packer.pack(instance)
+            packed = packer.bytes()
+        finally:
+            _release_packer(packer, len(packed))
+        return packed
+    finally:
+        _local.compress = compress
+
+
+def _compress(packed, do_compress: bool, compress_func):
+    """
+    Compress the msgpack data if needed and append the
+    compression flag.
+    """
+    if do_compress and len(packed) >= COMPRESS_MIN_SIZE:
+        data = compress_func(packed)
+        # In place for the bytearray returned by lz4_compress
+        data += COMPRESSED
+        return data
+    return b''.join((packed, UNCOMPRESSED))
+
+
+def _decompress(packed: bytes, do_decompress: bool, decompress_func):
+    """
+    Strip the compression flag and decompress the msgpack data
+    if needed.
+    """
+    data = memoryview(packed)[:-1]
+    if do_decompress and packed[-1:] == COMPRESSED:
+        data = decompress_func(data)
+    return data
+
+
+def _unpack(data, raw: bool) -> Any:
+    """
+    Unpack (decompressed) msgpack data
+    """
+    return msgpack.unpackb(
+        data, ext_hook=ext_hook,
+        max_ext_len=MAX_EXT_LEN,
+        max_str_len=MAX_STR_LEN, raw=raw,
+        strict_map_key=False)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    Return the shared executor for dumpb_many/loadb_many
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+        return _executor
 
 
 def dumpb(instance: Any, do_compress=True, compress_func=lz4_compress,
           use_bin_type=True):
     """
-    Dump/pack instance with msgpack to bytes
+    Dump/pack instance with msgpack to bytes (or bytearray)
+
+    The last byte flags if the msgpack data is compressed, data smaller
+    than COMPRESS_MIN_SIZE is never compressed.
     """
-    if not do_compress:
-        compress_func = do_nothing
-    return compress_func(msgpack.packb(
-        instance, default=default, use_bin_type=use_bin_type))
+    if not use_bin_type:
+        return _compress(
+            _pack(instance, use_bin_type, do_compress),
+            do_compress, compress_func)
+
+    # Let the handlers know if the data will be compressed
+    compress = getattr(_local, 'compress', False)
+    _local.compress = do_compress
+    packer = _get_packer()
+    size = 0
+    try:
+        packer.pack(instance)
+        # Compress (or copy) directly from the internal buffer of the
+        # Packer, this saves a copy of the msgpack data
+        with packer.getbuffer() as packed:
+            size = len(packed)
+            return _compress(packed, do_compress, compress_func)
+    finally:
+        _local.compress = compress
+        _release_packer(packer, size)
 
 
 def loadb(packed: bytes, do_decompress=True, decompress_func=lz4_decompress,
@@ -255,9 +569,47 @@ def loadb(packed: bytes, do_decompress=True, decompress_func=lz4_decompress,
     """
     if packed is None:
         return None
-    if not do_decompress:
-        decompress_func = do_nothing
-    return msgpack.unpackb(
-        decompress_func(packed), ext_hook=ext_hook,
-        max_ext_len=MAX_EXT_LEN,
-        max_str_len=MAX_STR_LEN, raw=raw)
+    return _unpack(
+        _decompress(packed, do_decompress, decompress_func), raw)
+
+
+def dumpb_many(instances: Iterable[Any], executor: Executor = None,
+               do_compress=True, compress_func=lz4_compress,
+               use_bin_type=True) -> List[bytes]:
+    """
+    Dump/pack multiple instances, same as [dumpb(x) for x in instances]
+
+    The instances are packed with msgpack in the calling thread, the
+    compression (which releases the GIL) runs in parallel on the
+    executor. By default a shared ThreadPoolExecutor is used.
+    """
+    packed = [_pack(instance, use_bin_type, do_compress)
+              for instance in instances]
+    if executor is None:
+        executor = _get_executor()
+    return list(executor.map(
+        partial(_compress, do_compress=do_compress,
+                compress_func=compress_func),
+        packed))
+
+
+def loadb_many(packed: Iterable[bytes], executor: Executor = None,
+               do_decompress=True, decompress_func=lz4_decompress,
+               raw=False) -> List[Any]:
+    """
+    Load/unpack multiple bytes, same as [loadb(x) for x in packed]
+
+    The decompression (which releases the GIL) runs in parallel on the
+    executor, the msgpack data is unpacked in the calling thread. By
+    default a shared ThreadPoolExecutor is used.
+    """
+    if executor is None:
+        executor = _get_executor()
+
+    def decompress(data):
+        if data is None:
+            return None
+        return _decompress(data, do_decompress, decompress_func)
+
+    return [None if data is None else _unpack(data, raw)
+            for data in executor.map(decompress, packed)]
@@ -33,8 +33,8 @@ with open('HISTORY.rst') as history_file:
     history = history_file.read()
 
 lightweight_requirements = [
-    'numpy>=1.13',
-    'msgpack>=0.6.0',
+    'numpy>=1.17.0',
+    'msgpack>=1.0.0',
     'lz4>=2.1.6',
     'aioredis>=1.2.0'
 ]
@@ -1,7 +1,9 @@
 import pytest
+import sys
+import msgpack
 import numpy as np
 import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from asyncio_rpc.serialization import msgpack as msgpack_serialization
 
 
@@ -28,6 +30,15 @@ def test_numpy_serialization(serialize_deserialize):
     assert np.all(value == serialize_deserialize(value))
 
 
+def test_numpy_aligned_serialization(serialize_deserialize):
+    for value in (np.arange(31.), np.arange(3, dtype=np.complex128),
+                  np.arange(6, dtype=np.int32).reshape(2, 3),
+                  np.zeros(2, dtype=[('abc', '<i8'), ('d', '<f8')])):
+        deserialized = serialize_deserialize(value)
+        assert deserialized.flags.aligned
+        assert np.all(value == deserialized)
+
+
 def test_datetime_serialization(serialize_deserialize):
     value = datetime.datetime.now()
     assert value == serialize_deserialize(value)
@@ -46,6 +57,22 @@ def test_slice_serialization(serialize_deserialize):
     assert value == serialize_deserialize(value)
 
 
+def test_slice_with_none_serialization(serialize_deserialize):
+    for value in (slice(None), slice(-5, None), slice(None, None, -1),
+                  slice(0, 2 ** 63 - 1, None)):
+        assert value == serialize_deserialize(value)
+
+
+def test_slice_non_integer_serialization(serialize_deserialize):
+    for value in (slice('a', 'b'), slice(0.5, None), slice(2 ** 63),
+                  slice(0.0, 5), slice(False, 3), slice(True)):
+        deserialized = serialize_deserialize(value)
+        assert value == deserialized
+        for attr in ('start', 'stop', 'step'):
+            assert (type(getattr(value, attr)) is
+                    type(getattr(deserialized, attr)))
+
+
 def test_numpy_int32_serialization(serialize_deserialize):
     value = np.int32(123)
     deserialized = serialize_deserialize(value)
@@ -71,8 +98,32 @@ class DataclassWrapper:
     dataclass_test: DataclassTest
 
 
+@dataclass
+class DataclassSingleField:
+    uid: int
+
+
+@dataclass
+class DataclassNoInitField:
+    uid: int
+    name: str = 'test'
+    double_uid: int = field(init=False)
+
+    def __post_init__(self):
+        self.double_uid = self.uid * 2
+
+
+@dataclass(frozen=True)
+class DataclassFrozenNoInitField:
+    uid: int
+    counter: int = field(init=False, default=0)
+
+
 msgpack_serialization.register(DataclassTest)
 msgpack_serialization.register(DataclassWrapper)
+msgpack_serialization.register(DataclassSingleField)
+msgpack_serialization.register(DataclassNoInitField)
+msgpack_serialization.register(DataclassFrozenNoInitField)
 
 
 def test_dataclass_serialization(serialize_deserialize):
@@ -91,6 +142,29 @@ def test_dataclass_wrapper_serialization(serialize_deserialize):
         value.dataclass_test.data == deserialized.dataclass_test.data)
 
 
+def test_dataclass_single_field_serialization(serialize_deserialize):
+    value = DataclassSingleField(101)
+    assert value == serialize_deserialize(value)
+
+
+def test_dataclass_no_init_field_serialization(serialize_deserialize):
+    value = DataclassNoInitField(101, name='other')
+    assert value == serialize_deserialize(value)
+
+
+def test_dataclass_changed_no_init_field_serialization(
+        serialize_deserialize):
+    value = DataclassNoInitField(101)
+    value.double_uid = 5
+    deserialized = serialize_deserialize(value)
+    assert deserialized.double_uid == 5
+    assert value == deserialized
+
+    value = DataclassFrozenNoInitField(1)
+    object.__setattr__(value, 'counter', 5)
+    assert value == serialize_deserialize(value)
+
+
 @dataclass
 class UnregisteredTest:
     uid: int
@@ -101,3 +175,193 @@ def test_unregistered_serialization(serialize_deserialize):
     value = UnregisteredTest(101, np.arange(100, dtype=np.float32))
     with pytest.raises(TypeError):
         serialize_deserialize(value)
+
+
+def test_numpy_fortran_order_serialization(serialize_deserialize):
+    value = np.asfortranarray(np.arange(12, dtype=np.int16).reshape(3, 4))
+    deserialized = serialize_deserialize(value)
+    assert deserialized.flags.f_contiguous
+    assert np.all(value == deserialized)
+
+
+def test_numpy_non_contiguous_serialization(serialize_deserialize):
+    value = np.arange(24, dtype=np.float32).reshape(4, 6)[::2, 1::2]
+    assert np.all(value == serialize_deserialize(value))
+
+
+def test_numpy_empty_serialization(serialize_deserialize):
+    value = np.zeros((0, 5), dtype='>u4')
+    deserialized = serialize_deserialize(value)
+    assert deserialized.shape == value.shape
+    assert deserialized.dtype == value.dtype
+
+
+def test_numpy_structured_serialization(serialize_deserialize):
+    value = np.zeros(
+        3, dtype={'names': ['a', 'b'], 'formats': ['<i4', '<f8'],
+                  'offsets': [0, 8], 'itemsize': 24})
+    value['a'] = [1, 2, 3]
+    value['b'] = [.5, 1.5, 2.5]
+    deserialized = serialize_deserialize(value)
+    assert deserialized.dtype == value.dtype
+    assert np.all(value == deserialized)
+    assert value[1] == serialize_deserialize(value[1])
+
+
+def test_small_data_is_not_compressed():
+    packed = msgpack_serialization.dumpb({'small': 1})
+    assert packed[-1:] == msgpack_serialization.UNCOMPRESSED
+
+
+def test_large_data_is_compressed(serialize_deserialize):
+    value = np.zeros(1000, dtype=np.float64)
+    packed = msgpack_serialization.dumpb(value)
+    assert packed[-1:] == msgpack_serialization.COMPRESSED
+    assert len(packed) < value.nbytes
+    assert np.all(value == serialize_deserialize(value))
+
+
+def test_no_compression_serialization():
+    value = np.zeros(1000, dtype=np.float64)
+    packed = msgpack_serialization.dumpb(value, do_compress=False)
+    assert packed[-1:] == msgpack_serialization.UNCOMPRESSED
+    assert np.all(value == msgpack_serialization.loadb(packed))
+
+
+def test_numpy_shuffled_serialization(serialize_deserialize):
+    value = np.asfortranarray(
+        np.arange(1200, dtype=np.int32).reshape(30, 40))
+    deserialized = serialize_deserialize(value)
+    assert deserialized.dtype == value.dtype
+    assert deserialized.flags.f_contiguous
+    assert np.all(value == deserialized)
+
+
+def test_dumpb_loadb_many():
+    values = [{'small': 1}, None, np.arange(1000), slice(1, 2, 3)]
+    packed = msgpack_serialization.dumpb_many(values)
+    assert packed == [msgpack_serialization.dumpb(x) for x in values]
+
+    deserialized = msgpack_serialization.loadb_many(packed + [None])
+    assert len(deserialized) == 5
+    assert deserialized[0] == values[0]
+    assert deserialized[1] is None
+    assert np.all(deserialized[2] == values[2])
+    assert deserialized[3] == values[3]
+    assert deserialized[4] is None
+
+
+def test_numpy_multidimensional_serialization(serialize_deserialize):
+    value = np.arange(2 * 3 * 1 * 4 * 5, dtype=np.uint8).reshape(
+        2, 3, 1, 4, 5)
+    deserialized = serialize_deserialize(value)
+    assert deserialized.shape == value.shape
+    assert np.all(value == deserialized)
+
+
+def test_dataclass_int_keys_serialization(serialize_deserialize):
+    value = DataclassSingleField({1: 'a', 2.5: 'b'})
+    assert value == serialize_deserialize(value)
+
+
+class Nested:
+    def __init__(self, value):
+        self.value = value
+
+
+class NestedHandler:
+    """
+    Handler that calls dumpb/loadb itself, like the
+    DataclassHandler used to do
+    """
+    ext_type = 100
+    obj_type = Nested
+
+    @classmethod
+    def packb(cls, obj) -> bytes:
+        return bytes(msgpack_serialization.dumpb(
+            obj.value, do_compress=False))
+
+    @classmethod
+    def unpackb(cls, data):
+        return Nested(msgpack_serialization.loadb(data))
+
+
+msgpack_serialization.register(NestedHandler)
+
+
+def test_nested_dumpb_serialization(serialize_deserialize):
+    deserialized = serialize_deserialize([1, 2, Nested([3, 4]), 5])
+    assert deserialized[:2] == [1, 2]
+    assert deserialized[2].value == [3, 4]
+    assert deserialized[3] == 5
+
+
+def test_packer_reset_after_failure():
+    with pytest.raises(TypeError):
+        msgpack_serialization.dumpb([1, 2, UnregisteredTest(1, None)])
+    assert msgpack_serialization._local.packer.bytes() == b''
+    assert msgpack_serialization.loadb(
+        msgpack_serialization.dumpb([3, 4])) == [3, 4]
+
+
+def test_large_packer_is_dropped():
+    msgpack_serialization.dumpb(1)
+    assert msgpack_serialization._local.packer is not None
+    msgpack_serialization.dumpb(
+        b'x' * (msgpack_serialization.PACKER_MAX_BUFFER_SIZE + 1))
+    assert msgpack_serialization._local.packer is None
+
+
+def test_numpy_deserialized_is_read_only(serialize_deserialize):
+    # Small (not shuffled) and large (shuffled) array's
+    for value in (np.arange(31.), np.arange(32.), np.arange(1000)):
+        deserialized = serialize_deserialize(value)
+        assert not deserialized.flags.writeable
+        assert np.all(value == deserialized)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10),
+                    reason='kw_only requires Python 3.10')
+def test_dataclass_kw_only_serialization(serialize_deserialize):
+    @dataclass(kw_only=True)
+    class DataclassKwOnly:
+        uid: int
+        name: str
+
+    @dataclass
+    class DataclassKwOnlyField:
+        uid: int
+        name: str = field(kw_only=True)
+        data: list = None
+
+    msgpack_serialization.register(DataclassKwOnly)
+    msgpack_serialization.register(DataclassKwOnlyField)
+
+    for value in (DataclassKwOnly(uid=1, name='a'),
+                  DataclassKwOnlyField(2, [3], name='b')):
+        assert value == serialize_deserialize(value)
+
+
+def _numpy_ext_flags(packed):
+    # Flags byte of the NumpyArrayHandler ext data in dumpb output
+    data = msgpack_serialization._decompress(
+        packed, True, msgpack_serialization.lz4_decompress)
+    return msgpack.unpackb(
+        data, ext_hook=lambda ext_type, ext_data: ext_data)[1]
+
+
+def test_numpy_shuffled_only_when_compressed():
+    value = np.arange(1000)
+    shuffled = msgpack_serialization.NUMPY_SHUFFLED
+
+    assert _numpy_ext_flags(msgpack_serialization.dumpb(value)) & shuffled
+
+    packed = msgpack_serialization.dumpb(value, do_compress=False)
+    assert not _numpy_ext_flags(packed) & shuffled
+    deserialized = msgpack_serialization.loadb(packed)
+    assert not deserialized.flags.writeable
+    assert np.all(value == deserialized)
+
+    packed = msgpack_serialization.dumpb_many([value], do_compress=False)
+    assert not _numpy_ext_flags(packed[0]) & shuffled